@@ -1,13 +1,10 @@
 import streamlit as st
-from PIL import Image
 import os
 
 # Import your utility functions
-from utils.caption import get_caption
-from utils.emotion import get_dominant_color, infer_emotion_from_color
+from utils.ingest import ingest_upload
 from utils.gemini_story import generate_story
-from utils.tts_wrapper import tts_convert
-from utils.video_generator import generate_final_video
+from utils.story_renderer import analyze_drawing, render_story
 from utils.auto_description import auto_generate_description
 
 # Set Streamlit page settings
@@ -17,58 +14,111 @@ st.title("🎨 DreamCanvas+: AI Story from Kids' Drawings")
 # Ensure the output directory exists
 os.makedirs("outputs", exist_ok=True)
 
+# Use Speechify TTS with default voice
+TTS_OPTIONS = {
+    "provider": "speechify",
+    "voice_id": "scott",  # Default Speechify voice
+    "language": "en-US",
+    "model": "simba-english",
+}
+
+def preview_in(slot):
+    """Play render_story's first-sentence preview in a placeholder while the rest is encoded."""
+    return lambda video_path, subtitles_path: slot.video(video_path, subtitles=subtitles_path)
+
 # Upload section
 uploaded = st.file_uploader("Upload your child's drawing", type=["jpg", "png", "jpeg"])
 
 if uploaded:
-    image_path = os.path.join("outputs", uploaded.name)
-
-    with open(image_path, "wb") as f:
-        f.write(uploaded.read())
+    # Stream the upload to a content-hashed path, validating it before any decode
+    try:
+        uploaded.seek(0)
+        image_path = ingest_upload(uploaded)
+    except ValueError as e:
+        st.error(f"⚠️ {e}")
+        st.stop()
 
     st.image(image_path, caption="Drawing Uploaded", use_column_width=True)
 
+    motion = "kenburns" if st.checkbox("🎥 Slow zoom & pan over the drawing") else "still"
+
+    # Results are kept in the session so the story can be edited and re-rendered;
+    # forget them when a different drawing is uploaded
+    if st.session_state.get("image_path") != image_path:
+        for key in ("caption", "emotion", "story", "render"):
+            st.session_state.pop(key, None)
+        st.session_state["image_path"] = image_path
+
     if st.button("✨ Create Story Video"):
         try:
             with st.spinner("🔍 Captioning drawing..."):
-                caption = get_caption(Image.open(image_path))
-
-            color = get_dominant_color(image_path)
-            emotion = infer_emotion_from_color(color)
-
-            st.success(f"📝 Caption: {caption}")
-            st.success(f"🎭 Emotion: {emotion}")
+                caption, emotion = analyze_drawing(image_path)
 
             with st.spinner("🧠 Generating story..."):
                 story = generate_story(caption, emotion)
-                st.text_area("📖 Story", story, height=150)
-
-            with st.spinner("🎤 Generating voice..."):
-                # Use Speechify TTS with default voice
-                voice_id = "scott"  # Default Speechify voice
-                audio_path = tts_convert(
-                    text=story,
-                    voice_id=voice_id,
-                    provider="speechify",
-                    language="en-US",
-                    model="simba-english"
-                )
-                st.audio(audio_path)
-
-            with st.spinner("🎞️ Generating video..."):
-                final_video = generate_final_video(image_path, audio_path, story)
-                st.video(final_video)
-
-            with st.spinner("📝 Generating description..."):
-                desc = auto_generate_description(caption, emotion, story)
-                st.text_area("📄 Video Description", desc, height=200)
-
-            # Download buttons
-            with open(final_video, "rb") as f_vid:
-                st.download_button("📥 Download Video", f_vid, file_name="dreamcanvas_video.mp4")
-
-            with open(audio_path, "rb") as f_audio:
-                st.download_button("📥 Download Audio", f_audio, file_name="dreamcanvas_audio.mp3")
+
+            preview_slot = st.empty()
+            with st.spinner("🎤 Generating voice and video..."):
+                render = render_story(image_path, story, tts_options=TTS_OPTIONS, motion=motion,
+                                      preview=preview_in(preview_slot))
+            preview_slot.empty()
+
+            st.session_state.update(caption=caption, emotion=emotion, story=story,
+                                    story_editor=story, render=render)
 
         except Exception as e:
             st.error(f"⚠️ Something went wrong: {e}")
+
+    if "render" in st.session_state:
+        caption = st.session_state["caption"]
+        emotion = st.session_state["emotion"]
+
+        st.success(f"📝 Caption: {caption}")
+        st.success(f"🎭 Emotion: {emotion}")
+
+        edited_story = st.text_area("📖 Story (edit it and update the video)", key="story_editor", height=150)
+
+        if st.button("🔁 Update Video"):
+            try:
+                # Only sentences whose text changed are re-narrated and re-encoded
+                preview_slot = st.empty()
+                with st.spinner("🔁 Updating changed sentences..."):
+                    render = render_story(image_path, edited_story, tts_options=TTS_OPTIONS, motion=motion,
+                                          preview=preview_in(preview_slot))
+                preview_slot.empty()
+                st.session_state.update(story=edited_story, render=render)
+                st.info(f"♻️ Re-narrated {render['sentences_synthesised']} of {render['sentences']} sentences, "
+                        f"re-encoded {render['segments_rendered']} video segments")
+
+            except Exception as e:
+                st.error(f"⚠️ Something went wrong: {e}")
+
+        story = st.session_state["story"]
+        render = st.session_state["render"]
+
+        # The cache is shared with other sessions and may have evicted this
+        # render while the page sat idle; rebuilding it reuses whatever is left
+        if not all(os.path.exists(render[key]) for key in ("audio_path", "video_path", "subtitles_path")):
+            try:
+                with st.spinner("🔁 Restoring video..."):
+                    render = render_story(image_path, story, tts_options=TTS_OPTIONS, motion=motion)
+                st.session_state["render"] = render
+            except Exception as e:
+                st.error(f"⚠️ Something went wrong: {e}")
+                st.stop()
+
+        st.audio(render["audio_path"], format="audio/mp4")
+        st.video(render["video_path"], subtitles=render["subtitles_path"])
+
+        desc = auto_generate_description(caption, emotion, story)
+        st.text_area("📄 Video Description", desc, height=200)
+
+        # Download buttons
+        with open(render["video_path"], "rb") as f_vid:
+            st.download_button("📥 Download Video", f_vid, file_name="dreamcanvas_video.mp4")
+
+        with open(render["audio_path"], "rb") as f_audio:
+            st.download_button("📥 Download Audio", f_audio, file_name="dreamcanvas_audio.m4a")
+
+        with open(render["subtitles_path"], "rb") as f_subs:
+            st.download_button("📥 Download Subtitles", f_subs, file_name="dreamcanvas_subtitles.vtt")
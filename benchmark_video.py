@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark video rendering: still frame vs Ken Burns zoom/pan.
+
+Prepares the synthetic drawing once, then renders it through the app's
+encoder path (render_video_segment + concat_video_segments) in both motion
+modes, so both encode the same source at the same output size. Reports the
+render time of each and the Ken Burns / still ratio.
+
+Example:
+    python benchmark_video.py --size 2048x1536 --duration 40 --repeats 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from utils.synthetic_assets import SilentAudio, make_drawing, make_story, parse_sizes
+from utils.video_generator import MOTION_MODES, concat_video_segments, prepare_source_image, render_video_segment
+
+def benchmark(size, duration, repeats, fps=24):
+    """Return the output size and the best-of-N render time in seconds for every motion mode."""
+    width, height = size
+    story = make_story(int(duration * 2.5))
+    frames = max(1, int(round(duration * fps)))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = os.path.join(temp_dir, "drawing.png")
+        with open(image_path, "wb") as f:
+            f.write(make_drawing(width, height))
+
+        audio_path = os.path.join(temp_dir, "narration.mp3")
+        with open(audio_path, "wb") as f:
+            f.write(SilentAudio().mp3(duration))
+
+        # Both modes start from the same prepared frame, as in render_story
+        source_path = os.path.join(temp_dir, "source.png")
+        output_size = prepare_source_image(image_path, source_path)
+
+        timings = {}
+        for motion in MOTION_MODES:
+            runs = []
+            for i in range(repeats):
+                segment_path = os.path.join(temp_dir, f"{motion}_{i}_segment.mp4")
+                output_path = os.path.join(temp_dir, f"{motion}_{i}.mp4")
+                started = time.perf_counter()
+                render_video_segment(source_path, frames, segment_path, overlay_text=story, motion=motion,
+                                     fade_in=True, fade_out=True, fps=fps)
+                concat_video_segments([segment_path], audio_path, output_path)
+                runs.append(time.perf_counter() - started)
+            timings[motion] = min(runs)
+        return output_size, timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark still vs Ken Burns video rendering")
+    parser.add_argument("--size", default="1024x768", help="Drawing size, e.g. 2048x1536")
+    parser.add_argument("--duration", type=float, default=30, help="Narration length in seconds")
+    parser.add_argument("--repeats", type=int, default=3, help="Renders per mode (best time is reported)")
+    args = parser.parse_args()
+
+    (width, height), timings = benchmark(parse_sizes(args.size)[0], args.duration, args.repeats)
+
+    print("=" * 50)
+    print(f"VIDEO RENDER BENCHMARK ({args.size} -> {width}x{height}, {args.duration:g}s narration, "
+          f"best of {args.repeats})")
+    print("=" * 50)
+    for motion, seconds in timings.items():
+        print(f"{motion:<10} {seconds:7.2f} s")
+    print(f"kenburns / still: {timings['kenburns'] / timings['still']:.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
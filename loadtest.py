@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Concurrent-user load test for the DreamCanvas+ pipeline.
+
+Simulates N sessions running the same flow as app.py (upload, caption,
+emotion, story, TTS, video, description) against local stand-ins for
+Gemini, Speechify and ElevenLabs, so it runs on a plain Linux box with no
+network. Captioning and video encoding run for real.
+
+Example:
+    python loadtest.py --sessions 20 --rate 0.5 --concurrency 4 --sizes 800x600,2048x1536
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from utils.synthetic_assets import SilentAudio, make_drawing, make_story, parse_sizes
+
+STAGES = ["upload", "analysis", "story", "render", "description"]
+
+def word_speech_marks(text, words_per_second):
+    """Evenly spaced word marks in Speechify's speech_marks shape."""
+    chunks = []
+    position = 0
+    for i, word in enumerate(text.split()):
+        start = text.index(word, position)
+        position = start + len(word)
+        chunks.append({
+            "type": "word",
+            "start": start,
+            "end": position,
+            "start_time": int(i * 1000 / words_per_second),
+            "end_time": int((i + 1) * 1000 / words_per_second),
+            "value": word,
+        })
+    return {
+        "type": "sentence",
+        "start": 0,
+        "end": len(text),
+        "start_time": 0,
+        "end_time": chunks[-1]["end_time"] if chunks else 0,
+        "value": text,
+        "chunks": chunks,
+    }
+
+def make_fake_speechify(audio, latency, words_per_second):
+    class FakeSpeechify:
+        """Stand-in for speechify.Speechify returning silent audio."""
+
+        def __init__(self, token=None, **kwargs):
+            self.tts = SimpleNamespace(audio=SimpleNamespace(speech=self._speech))
+
+        def _speech(self, input, **kwargs):
+            time.sleep(latency)
+            duration = len(input.split()) / words_per_second
+            return SimpleNamespace(
+                audio_data=base64.b64encode(audio.mp3(duration)).decode("ascii"),
+                audio_format="mp3",
+                speech_marks=word_speech_marks(input, words_per_second),
+                billable_characters_count=len(input),
+            )
+
+    return FakeSpeechify
+
+def make_fake_elevenlabs(audio, latency, words_per_second):
+    class FakeElevenLabs:
+        """Stand-in for elevenlabs.ElevenLabs returning silent audio."""
+
+        def __init__(self, api_key=None, **kwargs):
+            self.text_to_speech = SimpleNamespace(convert=self._convert)
+
+        def _convert(self, text, **kwargs):
+            time.sleep(latency)
+            data = audio.mp3(len(text.split()) / words_per_second)
+            return iter([data[i:i + 4096] for i in range(0, len(data), 4096)])
+
+    return FakeElevenLabs
+
+def start_fake_gemini(latency, story_words):
+    """Serve Gemini's generateContent response shape on a local port."""
+
+    class FakeGeminiHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            story = make_story(story_words, seed=random.randrange(1 << 30))
+            body = json.dumps({"candidates": [{"content": {"parts": [{"text": story}]}}]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGeminiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[index]
+
+def disk_usage(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+def run_session(session_id, upload_bytes, run_dir, provider):
+    """Run one app.py-equivalent session and return per-stage timings."""
+    from utils.gemini_story import generate_story
+    from utils.ingest import ingest_upload
+    from utils.story_renderer import analyze_drawing, render_story
+    from utils.auto_description import auto_generate_description
+
+    session_dir = os.path.join(run_dir, f"session_{session_id:04d}")
+    os.makedirs(session_dir)
+    timings = {}
+
+    def timed(stage, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings[stage] = time.perf_counter() - started
+        return result
+
+    # Same ingestion as app.py: chunked copy, header validation, downsampling
+    image_path = timed("upload", ingest_upload, io.BytesIO(upload_bytes), session_dir)
+    # A cache per session keeps every session on the cold path; a shared
+    # cache would let repeated drawings skip the work being measured.
+    cache_dir = os.path.join(session_dir, "cache")
+    caption, emotion = timed("analysis", analyze_drawing, image_path, cache_dir)
+    story = timed("story", generate_story, caption, emotion)
+    if story.startswith("Oops!"):
+        raise RuntimeError(story)
+    timed("render", render_story, image_path, story, cache_dir=cache_dir,
+          tts_options={"provider": provider, "api_key": "load-test"})
+    timed("description", auto_generate_description, caption, emotion, story)
+    return timings
+
+def run_load_test(args):
+    import utils.gemini_story as gemini_story
+
+    run_dir = tempfile.mkdtemp(prefix="dreamcanvas_load_", dir=args.output_dir)
+    audio = SilentAudio()
+    gemini = start_fake_gemini(args.gemini_latency, args.story_words)
+    sizes = parse_sizes(args.sizes)
+    drawings = [make_drawing(w, h, fmt="PNG", seed=i) for i, (w, h) in enumerate(sizes)]
+
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(gemini_story, "GEMINI_API_BASE",
+                                         f"http://127.0.0.1:{gemini.server_address[1]}"))
+        if args.provider == "speechify":
+            stack.enter_context(patch("utils.speechify_voice.Speechify",
+                                      make_fake_speechify(audio, args.tts_latency, args.words_per_second)))
+        else:
+            stack.enter_context(patch("utils.elevenlabs_voice.ElevenLabs",
+                                      make_fake_elevenlabs(audio, args.tts_latency, args.words_per_second)))
+        if args.fake_caption:
+            stack.enter_context(patch("utils.caption.caption_batch",
+                                      lambda images: ["a drawing of a house and a sun"] * len(images)))
+
+        results = []
+        errors = []
+        lock = threading.Lock()
+
+        def session(session_id, arrived_at):
+            started = time.perf_counter()
+            try:
+                timings = run_session(session_id, drawings[session_id % len(drawings)], run_dir, args.provider)
+            except Exception as e:
+                with lock:
+                    errors.append(f"session {session_id}: {e}")
+                return
+            finished = time.perf_counter()
+            with lock:
+                results.append({
+                    "queue_wait": started - arrived_at,
+                    "latency": finished - arrived_at,
+                    "stages": timings,
+                })
+
+        rng = random.Random(args.seed)
+        cpu_before = os.times()
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for session_id in range(args.sessions):
+                pool.submit(session, session_id, time.perf_counter())
+                if args.rate > 0 and session_id < args.sessions - 1:
+                    time.sleep(rng.expovariate(args.rate))
+        wall = time.perf_counter() - wall_started
+        cpu_after = os.times()
+
+    gemini.shutdown()
+
+    cpu_seconds = sum(after - before for after, before in
+                      zip(cpu_after[:4], cpu_before[:4]))
+    latencies = [r["latency"] for r in results]
+    report = {
+        "sessions": args.sessions,
+        "completed": len(results),
+        "errors": errors,
+        "concurrency": args.concurrency,
+        "arrival_rate": args.rate,
+        "sizes": args.sizes,
+        "wall_seconds": round(wall, 2),
+        "throughput_per_min": round(len(results) / wall * 60, 2) if wall else None,
+        "latency_seconds": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": percentile(latencies, 100),
+        },
+        "queue_wait_p95_seconds": percentile([r["queue_wait"] for r in results], 95),
+        "stage_p95_seconds": {
+            stage: percentile([r["stages"][stage] for r in results if stage in r["stages"]], 95)
+            for stage in STAGES
+        },
+        "cpu_seconds": round(cpu_seconds, 2),
+        "cpu_utilisation_percent": round(cpu_seconds / wall / (os.cpu_count() or 1) * 100, 1) if wall else None,
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_child_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "disk_usage_mb": round(disk_usage(run_dir) / (1024 * 1024), 2),
+        "run_dir": run_dir,
+    }
+
+    if not args.keep:
+        shutil.rmtree(run_dir, ignore_errors=True)
+    return report
+
+def print_report(report):
+    print("=" * 50)
+    print("LOAD TEST RESULTS")
+    print("=" * 50)
+    print(f"Sessions:      {report['completed']}/{report['sessions']} completed "
+          f"(concurrency={report['concurrency']}, rate={report['arrival_rate']}/s, sizes={report['sizes']})")
+    print(f"Wall time:     {report['wall_seconds']} s")
+    print(f"Throughput:    {report['throughput_per_min']} sessions/min")
+    latency = report["latency_seconds"]
+    if latency["p50"] is not None:
+        print(f"Latency:       p50={latency['p50']:.2f}s p95={latency['p95']:.2f}s "
+              f"p99={latency['p99']:.2f}s max={latency['max']:.2f}s")
+        print(f"Queue wait:    p95={report['queue_wait_p95_seconds']:.2f}s")
+        print("Stage p95:     " + ", ".join(
+            f"{stage}={seconds:.2f}s" for stage, seconds in report["stage_p95_seconds"].items()
+            if seconds is not None))
+    print(f"CPU:           {report['cpu_seconds']} s ({report['cpu_utilisation_percent']}% of all cores)")
+    print(f"Peak RSS:      {report['peak_rss_mb']} MB (largest child process {report['peak_child_rss_mb']} MB)")
+    print(f"Disk usage:    {report['disk_usage_mb']} MB")
+    for error in report["errors"]:
+        print(f"❌ {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for the DreamCanvas+ pipeline")
+    parser.add_argument("--sessions", type=int, default=10, help="Total number of simulated sessions")
+    parser.add_argument("--rate", type=float, default=1.0,
+                        help="Mean session arrival rate per second (Poisson); 0 submits all at once")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum sessions in flight")
+    parser.add_argument("--sizes", default="1024x768", help="Comma-separated drawing sizes, e.g. 800x600,2048x1536")
+    parser.add_argument("--provider", choices=["speechify", "elevenlabs"], default="speechify")
+    parser.add_argument("--story-words", type=int, default=90, help="Length of the fake Gemini story")
+    parser.add_argument("--words-per-second", type=float, default=2.5, help="Speaking rate of the fake TTS")
+    parser.add_argument("--gemini-latency", type=float, default=1.0, help="Simulated Gemini response time (s)")
+    parser.add_argument("--tts-latency", type=float, default=1.5, help="Simulated TTS response time (s)")
+    parser.add_argument("--fake-caption", action="store_true",
+                        help="Skip BLIP and return a fixed caption (use when the model weights are not cached)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default=None, help="Parent directory for per-run outputs")
+    parser.add_argument("--keep", action="store_true", help="Keep generated files after the run")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = run_load_test(args)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import http.client
+import io
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from utils import caption
+from utils.caption_server import CaptionBatcher, make_handler
+
+class TestCaptionBatcher:
+    """Test suite for the caption server's micro-batching."""
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Requests arriving within max_wait_ms are captioned together."""
+        calls = []
+
+        def fake_caption_fn(images):
+            calls.append(len(images))
+            return [f"caption {image}" for image in images]
+
+        batcher = CaptionBatcher(max_batch_size=4, max_wait_ms=200, caption_fn=fake_caption_fn).start()
+        results = {}
+
+        def worker(i):
+            results[i] = batcher.submit(i, timeout=5)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == {i: f"caption {i}" for i in range(4)}
+        assert calls == [4]
+
+        stats = batcher.stats()
+        assert stats["batches"] == 1
+        assert stats["requests"] == 4
+        assert stats["batch_size_histogram"] == {4: 1}
+        assert stats["queue_latency_ms"]["max"] is not None
+
+    def test_batch_dispatched_after_max_wait(self):
+        """A lone request is not held longer than max_wait_ms."""
+        batcher = CaptionBatcher(max_batch_size=8, max_wait_ms=10,
+                                 caption_fn=lambda images: ["x"] * len(images)).start()
+
+        started = time.monotonic()
+        assert batcher.submit("image", timeout=5) == "x"
+        assert time.monotonic() - started < 1
+        assert batcher.stats()["batch_size_histogram"] == {1: 1}
+
+    def test_errors_propagate_to_every_request(self):
+        """A failing batch raises in each waiting caller."""
+        def failing_caption_fn(images):
+            raise RuntimeError("model exploded")
+
+        batcher = CaptionBatcher(max_batch_size=2, max_wait_ms=10, caption_fn=failing_caption_fn).start()
+
+        with pytest.raises(RuntimeError, match="model exploded"):
+            batcher.submit("image", timeout=5)
+
+class TestCaptionServerHTTP:
+    """Test suite for the caption server's HTTP front end and client routing."""
+
+    @pytest.fixture
+    def server(self):
+        """Caption server on an ephemeral port whose "captions" are the image sizes."""
+        batcher = CaptionBatcher(max_batch_size=4, max_wait_ms=10,
+                                 caption_fn=lambda images: [f"{i.width}x{i.height}" for i in images]).start()
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(batcher, max_bytes=4096, max_pixels=10_000))
+        thread = threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        yield httpd.server_address
+        httpd.shutdown()
+        httpd.server_close()
+
+    def post(self, address, body, length=None):
+        connection = http.client.HTTPConnection(*address, timeout=5)
+        connection.putrequest("POST", "/caption")
+        connection.putheader("Content-Length", str(len(body) if length is None else length))
+        connection.endheaders()
+        connection.send(body)
+        status = connection.getresponse().status
+        connection.close()
+        return status
+
+    @staticmethod
+    def png(size):
+        buffer = io.BytesIO()
+        Image.new("RGB", size).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def test_get_caption_uses_server_when_configured(self, server, monkeypatch):
+        monkeypatch.setenv(caption.CAPTION_SERVER_ENV, "http://%s:%d" % server)
+
+        with patch.object(caption, "caption_batch", side_effect=AssertionError("BLIP loaded locally")):
+            assert caption.get_caption(Image.new("RGB", (32, 16))) == "32x16"
+
+    def test_rejects_oversized_body_without_reading_it(self, server):
+        assert self.post(server, b"", length=10 ** 9) == 413
+
+    def test_rejects_too_many_pixels(self, server):
+        assert self.post(server, self.png((200, 200))) == 413
+        assert self.post(server, self.png((100, 100))) == 200
+
+    def test_rejects_invalid_images(self, server):
+        assert self.post(server, b"definitely not a drawing") == 400
+
+class TestLoadModel:
+    """Test suite for the lazily loaded BLIP model."""
+
+    def test_concurrent_callers_share_one_model(self):
+        loads = []
+
+        def from_pretrained(name):
+            loads.append(name)
+            time.sleep(0.05)
+            return object()
+
+        fake = SimpleNamespace(from_pretrained=from_pretrained)
+        transformers = SimpleNamespace(BlipProcessor=fake, BlipForConditionalGeneration=fake)
+        results = []
+        with patch.dict(sys.modules, transformers=transformers), \
+             patch.object(caption, "_processor", None), patch.object(caption, "_model", None):
+            threads = [threading.Thread(target=lambda: results.append(caption.load_model())) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(loads) == 2
+        assert len(set(map(id, (model for _, model in results)))) == 1
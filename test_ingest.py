@@ -0,0 +1,100 @@
+import io
+import os
+import struct
+import tempfile
+import zlib
+
+import pytest
+from PIL import Image
+
+from utils.ingest import ingest_upload
+
+def encode(size, fmt="PNG", color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+def png_header(width, height):
+    """A PNG that declares width x height but carries no pixel data."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IEND", b"")
+
+class TestIngestUpload:
+    """Test suite for upload ingestion."""
+
+    @pytest.fixture
+    def upload_dir(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            yield temp_dir
+
+    def test_stores_under_content_hash(self, upload_dir):
+        path = ingest_upload(io.BytesIO(encode((64, 48))), upload_dir, chunk_size=100)
+
+        assert os.path.dirname(path) == upload_dir
+        assert path.endswith(".png")
+        assert Image.open(path).size == (64, 48)
+
+    def test_identical_uploads_are_deduplicated(self, upload_dir):
+        data = encode((64, 48), fmt="JPEG")
+        first = ingest_upload(io.BytesIO(data), upload_dir)
+        second = ingest_upload(io.BytesIO(data), upload_dir)
+
+        assert first == second
+        assert first.endswith(".jpg")
+        assert os.listdir(upload_dir) == [os.path.basename(first)]
+
+    def test_oversize_image_is_downsampled(self, upload_dir):
+        path = ingest_upload(io.BytesIO(encode((400, 200), fmt="JPEG")), upload_dir, max_side=100)
+
+        assert max(Image.open(path).size) == 100
+
+    def test_mpo_is_stored_as_jpeg(self, upload_dir):
+        """Multi-picture JPEGs from phone cameras are accepted like any other JPEG."""
+        buffer = io.BytesIO()
+        frame = Image.new("RGB", (400, 200), (200, 40, 40))
+        frame.save(buffer, format="MPO", save_all=True, append_images=[frame])
+
+        path = ingest_upload(io.BytesIO(buffer.getvalue()), upload_dir, max_side=100)
+
+        assert path.endswith(".jpg")
+        with Image.open(path) as img:
+            assert img.format == "JPEG"
+            assert max(img.size) == 100
+
+    def test_rejects_too_many_pixels(self, upload_dir):
+        with pytest.raises(ValueError, match="Image is too large"):
+            ingest_upload(io.BytesIO(encode((100, 100))), upload_dir, max_pixels=5000)
+        assert os.listdir(upload_dir) == []
+
+    def test_rejects_decompression_bomb_header(self, upload_dir):
+        """Headers beyond Pillow's own limit are rejected as too large, not raised as crashes."""
+        with pytest.raises(ValueError, match="Image is too large"):
+            ingest_upload(io.BytesIO(png_header(15000, 15000)), upload_dir)
+        assert os.listdir(upload_dir) == []
+
+    def test_png_pixel_cap_is_tighter_than_jpeg(self, upload_dir):
+        """PNGs are decoded in full, so they get a smaller cap than JPEGs."""
+        with pytest.raises(ValueError, match="the limit for PNG"):
+            ingest_upload(io.BytesIO(encode((100, 100))), upload_dir, max_png_pixels=5000)
+
+        path = ingest_upload(io.BytesIO(encode((100, 100), fmt="JPEG")), upload_dir, max_png_pixels=5000)
+        assert path.endswith(".jpg")
+
+    def test_rejects_too_many_bytes(self, upload_dir):
+        with pytest.raises(ValueError, match="Upload is larger than"):
+            ingest_upload(io.BytesIO(b"x" * 2048), upload_dir, chunk_size=512, max_bytes=1024)
+        assert os.listdir(upload_dir) == []
+
+    def test_rejects_non_images(self, upload_dir):
+        with pytest.raises(ValueError, match="not a valid image"):
+            ingest_upload(io.BytesIO(b"definitely not a drawing"), upload_dir)
+        with pytest.raises(ValueError, match="not a valid image"):
+            ingest_upload(io.BytesIO(png_header(64, 48)), upload_dir)
+        assert os.listdir(upload_dir) == []
+
+    def test_rejects_unsupported_formats(self, upload_dir):
+        with pytest.raises(ValueError, match="Unsupported image format: GIF"):
+            ingest_upload(io.BytesIO(encode((10, 10), fmt="GIF")), upload_dir)
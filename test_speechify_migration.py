@@ -112,6 +112,23 @@ class TestSpeechifyMigration:
                     finally:
                         os.chdir(original_cwd)
     
+    def test_speechify_tts_returns_speech_marks(self, mock_speechify_client):
+        """Test that Speechify TTS can return the speech marks alongside the audio path."""
+        with patch('utils.speechify_voice.Speechify', return_value=mock_speechify_client):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                output_path = os.path.join(temp_dir, "story.mp3")
+
+                result, speech_marks = speechify_tts(
+                    text="hi",
+                    api_key="test_key",
+                    output_path=output_path,
+                    return_speech_marks=True
+                )
+
+                assert result == output_path
+                assert os.path.exists(result)
+                assert speech_marks["chunks"][0]["value"] == "hi"
+
     def test_speechify_tts_missing_api_key(self):
         """Test that Speechify TTS raises error when no API key is available."""
         with patch.dict(os.environ, {}, clear=True):
@@ -0,0 +1,151 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+import pytest
+
+from utils import story_renderer
+from utils.story_renderer import content_hash, evict_cache, render_story, split_sentences
+
+def touch(path):
+    with open(path, "wb") as f:
+        f.write(b"fake")
+    return path
+
+class TestStoryRenderer:
+    """Test suite for incremental story rendering."""
+
+    @pytest.fixture
+    def workspace(self):
+        """Temporary cache dir and drawing with the TTS and ffmpeg stages mocked out."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            image_path = os.path.join(temp_dir, "drawing.png")
+            touch(image_path)
+
+            def fake_tts(text, output_path, return_speech_marks, **kwargs):
+                touch(output_path)
+                return output_path, None
+
+            with patch("utils.tts_wrapper.tts_convert", side_effect=fake_tts) as tts, \
+                 patch.object(story_renderer, "_decode_to_wav", side_effect=lambda src, dst: touch(dst)), \
+                 patch.object(story_renderer, "_audio_duration_ms", return_value=1000), \
+                 patch.object(story_renderer, "prepare_source_image", side_effect=lambda src, out: touch(out)), \
+                 patch.object(story_renderer, "render_video_segment",
+                              side_effect=lambda src, frames, out, **kw: touch(out)) as segment, \
+                 patch.object(story_renderer, "concat_video_segments", side_effect=lambda segs, audio, out, *a: touch(out)), \
+                 patch.object(story_renderer, "_stitch_audio", side_effect=lambda paths, out: touch(out)), \
+                 patch.object(story_renderer, "_extract_audio", side_effect=lambda video, out: touch(out)):
+                yield {
+                    "image_path": image_path,
+                    "cache_dir": os.path.join(temp_dir, "cache"),
+                    "tts": tts,
+                    "segment": segment,
+                }
+
+    def test_split_sentences(self):
+        assert split_sentences('The moon said "hi." Then it slept!\n\nThe end') == [
+            'The moon said "hi."',
+            "Then it slept!",
+            "The end",
+        ]
+
+    def test_content_hash_is_stable_and_unambiguous(self):
+        assert content_hash("ab", "c") == content_hash("ab", "c")
+        assert content_hash("ab", "c") != content_hash("a", "bc")
+        assert content_hash({"a": 1, "b": 2}) == content_hash({"b": 2, "a": 1})
+
+    def test_edit_recomputes_only_changed_sentence(self, workspace):
+        """Editing one sentence re-synthesises and re-encodes only that sentence."""
+        story = "A dragon flew. It found a castle. The end!"
+        kwargs = dict(cache_dir=workspace["cache_dir"], burn_in_text=True)
+
+        first = render_story(workspace["image_path"], story, **kwargs)
+        assert first["sentences"] == 3
+        assert first["sentences_synthesised"] == 3
+        assert first["segments_rendered"] == 3
+
+        edited = render_story(workspace["image_path"], story.replace("a castle", "a cave"), **kwargs)
+        assert edited["sentences_synthesised"] == 1
+        assert edited["segments_rendered"] == 1
+        assert edited["video_path"] != first["video_path"]
+        assert workspace["tts"].call_args.kwargs["text"] == "It found a cave."
+
+    def test_unchanged_story_is_free(self, workspace):
+        story = "A dragon flew. The end!"
+        first = render_story(workspace["image_path"], story, cache_dir=workspace["cache_dir"])
+        again = render_story(workspace["image_path"], story, cache_dir=workspace["cache_dir"])
+
+        assert again["video_path"] == first["video_path"]
+        assert again["sentences_synthesised"] == 0
+        assert again["segments_rendered"] == 0
+        assert workspace["tts"].call_count == 2
+
+    def test_subtitles_follow_sentence_timing(self, workspace):
+        """Sentences without speech marks get one cue each, offset by the preceding audio."""
+        result = render_story(workspace["image_path"], "One. Two.", cache_dir=workspace["cache_dir"])
+
+        with open(result["subtitles_path"], encoding="utf-8") as f:
+            content = f.read()
+        assert "00:00:00.000 --> 00:00:01.000\nOne." in content
+        assert "00:00:01.000 --> 00:00:02.000\nTwo." in content
+
+    def test_empty_story(self, workspace):
+        with pytest.raises(ValueError, match="Story is empty"):
+            render_story(workspace["image_path"], "   ", cache_dir=workspace["cache_dir"])
+
+    def test_preview_plays_first_sentence_before_the_rest(self, workspace):
+        """The preview arrives before later segments are encoded and its segment is reused."""
+        previews = []
+
+        def on_preview(video_path, subtitles_path):
+            previews.append((video_path, workspace["segment"].call_count))
+            with open(subtitles_path, encoding="utf-8") as f:
+                assert "00:00:00.000 --> 00:00:01.000\nOne." in f.read()
+
+        result = render_story(workspace["image_path"], "One. Two. Three.", cache_dir=workspace["cache_dir"],
+                              preview=on_preview)
+
+        [(video_path, segments_encoded)] = previews
+        assert os.path.exists(video_path) and video_path != result["video_path"]
+        assert segments_encoded == 1
+        assert workspace["segment"].call_count == 3
+        assert result["segments_rendered"] == 3
+
+    def test_ken_burns_runs_across_segments(self, workspace):
+        """Each Ken Burns segment continues the motion where the previous one stopped."""
+        render_story(workspace["image_path"], "One. Two.", cache_dir=workspace["cache_dir"],
+                     motion="kenburns", fps=24)
+
+        calls = [c.kwargs for c in workspace["segment"].call_args_list]
+        assert [c["start_frame"] for c in calls] == [0, 24]
+        assert all(c["total_frames"] == 48 for c in calls)
+
+        # A longer story moves every segment along the zoom, so none can be reused
+        result = render_story(workspace["image_path"], "One. Two. Three.", cache_dir=workspace["cache_dir"],
+                              motion="kenburns", fps=24)
+        assert result["segments_rendered"] == 3
+
+    def test_cache_is_evicted_oldest_first(self, workspace):
+        final_dir = os.path.join(workspace["cache_dir"], "final")
+        os.makedirs(final_dir)
+        paths = []
+        for i, name in enumerate(["old", "newer", "newest"]):
+            path = touch(os.path.join(final_dir, name))
+            os.utime(path, (i, i))
+            paths.append(path)
+
+        evict_cache(workspace["cache_dir"], limits={"final": 8}, keep=[paths[0]])
+
+        assert sorted(os.listdir(final_dir)) == ["newest", "old"]
+
+    def test_recently_used_files_survive_eviction(self, workspace):
+        """Another session may still be showing a file, so recent ones are kept over the cap."""
+        final_dir = os.path.join(workspace["cache_dir"], "final")
+        os.makedirs(final_dir)
+        old = touch(os.path.join(final_dir, "old"))
+        os.utime(old, (0, 0))
+        touch(os.path.join(final_dir, "recent"))
+
+        evict_cache(workspace["cache_dir"], limits={"final": 0}, grace_seconds=60)
+
+        assert os.listdir(final_dir) == ["recent"]
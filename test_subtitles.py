@@ -0,0 +1,94 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+from utils.subtitles import (
+    flatten_word_marks,
+    format_srt,
+    format_webvtt,
+    offset_cues,
+    speech_marks_to_cues,
+    write_subtitles,
+)
+
+def word(value, start, end):
+    return {"type": "word", "start": 0, "end": len(value), "start_time": start, "end_time": end, "value": value}
+
+SPEECH_MARKS = {
+    "type": "sentence",
+    "start_time": 0,
+    "end_time": 2600,
+    "value": "Hi there. The moon smiled!",
+    "chunks": [
+        word("Hi", 0, 300),
+        word("there.", 300, 900),
+        word("The", 1100, 1300),
+        word("moon", 1300, 1800),
+        word("smiled!", 1800, 2600),
+    ],
+}
+
+class TestSubtitles:
+    """Test suite for speech-mark subtitles."""
+
+    def test_flatten_word_marks(self):
+        """Nested chunks flatten to word timings in order."""
+        assert flatten_word_marks(SPEECH_MARKS) == [
+            (0, 300, "Hi"),
+            (300, 900, "there."),
+            (1100, 1300, "The"),
+            (1300, 1800, "moon"),
+            (1800, 2600, "smiled!"),
+        ]
+
+    def test_flatten_sdk_objects(self):
+        """SDK model objects are read by attribute like dicts are read by key."""
+        marks = SimpleNamespace(chunks=[SimpleNamespace(value="Hi", start_time=0, end_time=250, chunks=None)])
+        assert flatten_word_marks(marks) == [(0, 250, "Hi")]
+
+    def test_flatten_missing_marks(self):
+        assert flatten_word_marks(None) == []
+
+    def test_sentence_cues(self):
+        """Words are grouped up to sentence punctuation."""
+        assert speech_marks_to_cues(SPEECH_MARKS) == [
+            (0, 900, "Hi there."),
+            (1100, 2600, "The moon smiled!"),
+        ]
+
+    def test_sentence_cues_split_long_sentences(self):
+        cues = speech_marks_to_cues(SPEECH_MARKS, max_chars=10)
+        assert [text for _, _, text in cues] == ["Hi there.", "The moon", "smiled!"]
+
+    def test_word_cues(self):
+        assert len(speech_marks_to_cues(SPEECH_MARKS, granularity="word")) == 5
+
+    def test_unsupported_granularity(self):
+        with pytest.raises(ValueError, match="Unsupported subtitle granularity"):
+            speech_marks_to_cues(SPEECH_MARKS, granularity="paragraph")
+
+    def test_offset_cues(self):
+        assert offset_cues([(0, 900, "Hi there.")], 1500) == [(1500, 2400, "Hi there.")]
+
+    def test_format_webvtt(self):
+        assert format_webvtt([(1100, 3723004, "The moon smiled!")]) == (
+            "WEBVTT\n\n00:00:01.100 --> 01:02:03.004\nThe moon smiled!\n"
+        )
+
+    def test_format_srt(self):
+        assert format_srt([(0, 900, "Hi there."), (1100, 2600, "The moon smiled!")]) == (
+            "1\n00:00:00,000 --> 00:00:00,900\nHi there.\n\n"
+            "2\n00:00:01,100 --> 00:00:02,600\nThe moon smiled!\n"
+        )
+
+    def test_write_subtitles_by_extension(self):
+        cues = speech_marks_to_cues(SPEECH_MARKS)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            vtt_path = write_subtitles(cues, os.path.join(temp_dir, "story.vtt"))
+            with open(vtt_path, encoding="utf-8") as f:
+                assert f.read().startswith("WEBVTT")
+
+            with pytest.raises(ValueError, match="Unsupported subtitle format"):
+                write_subtitles(cues, os.path.join(temp_dir, "story.txt"))
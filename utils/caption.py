@@ -1,10 +1,64 @@
-from transformers import BlipProcessor, BlipForConditionalGeneration
+import io
+import os
+import threading
+
 from PIL import Image
 
-processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
+MODEL_NAME = "Salesforce/blip-image-captioning-base"
 
-def get_caption(image):
-    inputs = processor(image, return_tensors="pt")
+# When set (e.g. "http://127.0.0.1:8765"), captions are requested from the
+# shared caption server (utils/caption_server.py) instead of loading BLIP here.
+CAPTION_SERVER_ENV = "CAPTION_SERVER_URL"
+
+_processor = None
+_model = None
+_model_lock = threading.Lock()
+
+def load_model():
+    """Load the BLIP processor and model once per process."""
+    global _processor, _model
+    if _model is None:
+        # Streamlit runs sessions on threads; without the lock each session
+        # arriving before the first load finishes would load its own copy
+        with _model_lock:
+            if _model is None:
+                from transformers import BlipProcessor, BlipForConditionalGeneration
+                _processor = BlipProcessor.from_pretrained(MODEL_NAME)
+                _model = BlipForConditionalGeneration.from_pretrained(MODEL_NAME)
+    return _processor, _model
+
+def caption_batch(images):
+    """
+    Caption several images with a single BLIP forward pass.
+
+    Args:
+        images (list[PIL.Image.Image]): Images to caption
+
+    Returns:
+        list[str]: One caption per image, in input order
+    """
+    processor, model = load_model()
+    images = [image.convert("RGB") for image in images]
+    inputs = processor(images=images, return_tensors="pt")
     out = model.generate(**inputs)
-    return processor.decode(out[0], skip_special_tokens=True)
+    return processor.batch_decode(out, skip_special_tokens=True)
+
+def _remote_caption(image, server_url, timeout=60):
+    import requests
+
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="PNG")
+    response = requests.post(
+        f"{server_url.rstrip('/')}/caption",
+        data=buffer.getvalue(),
+        headers={"Content-Type": "image/png"},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()["caption"]
+
+def get_caption(image):
+    server_url = os.getenv(CAPTION_SERVER_ENV)
+    if server_url:
+        return _remote_caption(image, server_url)
+    return caption_batch([image])[0]
@@ -0,0 +1,231 @@
+"""
+Shared caption inference server.
+
+Owns the single BLIP model for the host and groups concurrent caption
+requests from every app worker into micro-batches.
+
+Run it with:
+    python -m utils.caption_server --port 8765 --max-batch-size 8 --max-wait-ms 20
+
+and point the app at it:
+    export CAPTION_SERVER_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import io
+import json
+import queue
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+from .caption import caption_batch, load_model
+from .ingest import MAX_PNG_PIXELS, MAX_UPLOAD_BYTES
+
+class _PendingCaption:
+    """A single caption request waiting for its batch to finish."""
+
+    def __init__(self, image):
+        self.image = image
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.caption = None
+        self.error = None
+
+class CaptionBatcher:
+    """
+    Collect caption requests into micro-batches.
+
+    A batch is dispatched as soon as it holds max_batch_size requests, or
+    max_wait_ms after its first request arrived, whichever comes first.
+    """
+
+    def __init__(self, max_batch_size=8, max_wait_ms=20, caption_fn=caption_batch, latency_window=10000):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.caption_fn = caption_fn
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._queue_latencies = deque(maxlen=latency_window)
+        self._thread = threading.Thread(target=self._run, name="caption-batcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, image, timeout=None):
+        """Queue an image and block until its caption is ready."""
+        pending = _PendingCaption(image)
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for caption")
+        if pending.error is not None:
+            raise pending.error
+        return pending.caption
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.monotonic()
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._queue_latencies.extend(started - p.enqueued_at for p in batch)
+
+            try:
+                captions = self.caption_fn([p.image for p in batch])
+                for pending, caption in zip(batch, captions):
+                    pending.caption = caption
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+
+            for pending in batch:
+                pending.done.set()
+
+    def stats(self):
+        """
+        Batch-size distribution and queue latency summary.
+
+        Returns:
+            dict: batches, requests, batch_size_histogram and
+            queue_latency_ms percentiles (p50/p95/p99/max)
+        """
+        with self._lock:
+            histogram = dict(sorted(self._batch_sizes.items()))
+            latencies = sorted(self._queue_latencies)
+
+        batches = sum(histogram.values())
+        requests_served = sum(size * count for size, count in histogram.items())
+
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(round(p / 100.0 * (len(latencies) - 1))))
+            return round(latencies[index] * 1000, 2)
+
+        return {
+            "batches": batches,
+            "requests": requests_served,
+            "mean_batch_size": round(requests_served / batches, 2) if batches else None,
+            "batch_size_histogram": histogram,
+            "queue_latency_ms": {
+                "p50": percentile(50),
+                "p95": percentile(95),
+                "p99": percentile(99),
+                "max": percentile(100),
+            },
+        }
+
+def make_handler(batcher, request_timeout=120, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_PNG_PIXELS):
+    """
+    Build the HTTP handler for a batcher.
+
+    Clients send images that were already ingested at working resolution
+    and every image is decoded in full here, so requests are held to the
+    ingestion limits: at most max_bytes of body and max_pixels of image.
+    """
+    class CaptionRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send_json(200, batcher.stats())
+            elif self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/caption":
+                self._send_json(404, {"error": f"Unknown path: {self.path}"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", ""))
+            except ValueError:
+                self._send_json(411, {"error": "Content-Length is required"})
+                return
+            if length < 0 or length > max_bytes:
+                # Don't read the body, and don't keep the connection around to drain it
+                self.close_connection = True
+                self._send_json(413, {"error": f"Image is larger than {max_bytes // (1024 * 1024)} MB"})
+                return
+
+            try:
+                image = Image.open(io.BytesIO(self.rfile.read(length)))
+                width, height = image.size
+                if width * height > max_pixels:
+                    self._send_json(413, {"error": f"Image is too large ({width}x{height}); "
+                                                   f"the limit is {max_pixels // 1_000_000} megapixels"})
+                    return
+                image.load()
+            except Image.DecompressionBombError as e:
+                self._send_json(413, {"error": f"Image is too large: {e}"})
+                return
+            except Exception as e:
+                self._send_json(400, {"error": f"Invalid image: {e}"})
+                return
+
+            try:
+                caption = batcher.submit(image, timeout=request_timeout)
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+
+            self._send_json(200, {"caption": caption})
+
+        def log_message(self, format, *args):
+            # Keep per-request logging out of the way; use /stats instead.
+            pass
+
+    return CaptionRequestHandler
+
+def serve(host="127.0.0.1", port=8765, max_batch_size=8, max_wait_ms=20):
+    """Load BLIP once and serve caption requests until interrupted."""
+    load_model()
+    batcher = CaptionBatcher(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms).start()
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    print(f"Caption server listening on http://{host}:{port} "
+          f"(max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(batcher.stats(), indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared BLIP caption server with dynamic micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=20)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.max_batch_size, args.max_wait_ms)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from elevenlabs import ElevenLabs
 
-def elevenlabs_tts(text, voice_id, api_key):
+def elevenlabs_tts(text, voice_id, api_key, output_path="output_audio.mp3"):
     client = ElevenLabs(api_key=api_key)
 
     audio_stream = client.text_to_speech.convert(
@@ -13,7 +13,6 @@ def elevenlabs_tts(text, voice_id, api_key):
     # Combine all audio chunks from generator
     audio_bytes = b''.join(audio_stream)
 
-    output_path = "output_audio.mp3"
     with open(output_path, "wb") as f:
         f.write(audio_bytes)
 
@@ -0,0 +1,143 @@
+"""
+Upload ingestion.
+
+Streams an upload to disk in fixed-size chunks while hashing it, validates
+format and dimensions from the image header before anything is decoded,
+downsamples oversize drawings to the working resolution and stores the
+result under its content hash, so identical uploads share one file.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from PIL import Image
+
+CHUNK_SIZE = 1024 * 1024
+
+# Keep in step with server.maxUploadSize in .streamlit/config.toml
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+# Largest image we are willing to decode at all. JPEGs are decoded at a
+# reduced scale (see _downsample), so this bounds the header, not memory.
+MAX_PIXELS = 24_000_000
+
+# Working resolution for every later stage (captioning, colour, video)
+MAX_SIDE = 2048
+
+# PNGs have no reduced-scale decode, so the whole bitmap is held in memory
+# before it can be shrunk; allow only a little more than the working
+# resolution (about 34 MB as 8-bit RGBA)
+MAX_PNG_PIXELS = 2 * MAX_SIDE * MAX_SIDE
+
+# Phone cameras save MPO (a JPEG with extra preview frames); Pillow reports
+# those as "MPO" but the first frame is a plain JPEG, so store them as one
+ALLOWED_FORMATS = {"JPEG": ".jpg", "MPO": ".jpg", "PNG": ".png"}
+
+def _stream_to_disk(stream, directory, chunk_size, max_bytes):
+    """Copy the stream to a temporary file in chunks, returning (tmp_path, sha256 hex)."""
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"Upload is larger than {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                f.write(chunk)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest()
+
+def _inspect(path, max_pixels, max_png_pixels):
+    """Read format and size from the header only and reject anything we will not decode."""
+    try:
+        with Image.open(path) as img:
+            image_format, (width, height) = img.format, img.size
+            # Structural check (e.g. PNG chunk CRCs) without decoding pixel data
+            img.verify()
+    except Image.DecompressionBombError as e:
+        # Pillow refuses headers far beyond its own limit before we see the size
+        raise ValueError(f"Image is too large; the limit is {max_pixels // 1_000_000} megapixels") from e
+    except Exception as e:
+        # Malformed files surface as anything from OSError to IndexError
+        # inside the plugins; none of them may escape as a crash
+        raise ValueError(f"Upload is not a valid image: {e}") from e
+
+    if image_format not in ALLOWED_FORMATS:
+        raise ValueError(f"Unsupported image format: {image_format}. Supported formats: JPEG, PNG")
+    if width * height > max_pixels:
+        raise ValueError(f"Image is too large ({width}x{height}); the limit is {max_pixels // 1_000_000} megapixels")
+    if image_format == "PNG" and width * height > max_png_pixels:
+        raise ValueError(f"Image is too large ({width}x{height}); the limit for PNG is "
+                         f"{max_png_pixels // 1_000_000} megapixels, upload a JPEG or a smaller PNG")
+    return image_format, width, height
+
+def _downsample(src_path, dst_path, image_format, max_side):
+    with Image.open(src_path) as img:
+        # draft() lets the JPEG decoder scale down by 1/2-1/8 while decoding,
+        # so the full-resolution bitmap is never held in memory
+        img.draft("RGB", (max_side, max_side))
+        img.thumbnail((max_side, max_side))
+        if ALLOWED_FORMATS[image_format] == ".jpg":
+            img.convert("RGB").save(dst_path, format="JPEG", quality=90)
+        else:
+            img.save(dst_path, format="PNG")
+
+def ingest_upload(stream, upload_dir="outputs/uploads", chunk_size=CHUNK_SIZE, max_bytes=MAX_UPLOAD_BYTES,
+                  max_pixels=MAX_PIXELS, max_side=MAX_SIDE, max_png_pixels=MAX_PNG_PIXELS):
+    """
+    Store an uploaded drawing under the SHA-256 of the uploaded bytes.
+
+    Memory use is bounded by chunk_size while copying, plus the decoded
+    image when it needs downsampling: JPEGs are decoded at close to the
+    working resolution, PNGs in full, which max_png_pixels keeps small.
+
+    Args:
+        stream: File-like object with read(size), e.g. a Streamlit UploadedFile
+        upload_dir (str): Directory for ingested images
+        chunk_size (int): Bytes read and written per step
+        max_bytes (int): Reject uploads larger than this
+        max_pixels (int): Reject images whose header declares more pixels
+        max_side (int): Downsample images whose longer side exceeds this
+        max_png_pixels (int): Reject PNGs with more pixels than this, since
+            they are decoded at full size
+
+    Returns:
+        str: Path to the stored image (at most max_side on its longer side)
+
+    Raises:
+        ValueError: If the upload is too big, not a JPEG/PNG, or malformed
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    tmp_path, key = _stream_to_disk(stream, upload_dir, chunk_size, max_bytes)
+
+    try:
+        # Identical uploads were already validated and stored; reuse that file
+        for extension in sorted(set(ALLOWED_FORMATS.values())):
+            existing = os.path.join(upload_dir, f"{key}{extension}")
+            if os.path.exists(existing):
+                return existing
+
+        image_format, width, height = _inspect(tmp_path, max_pixels, max_png_pixels)
+        path = os.path.join(upload_dir, f"{key}{ALLOWED_FORMATS[image_format]}")
+
+        if max(width, height) > max_side:
+            resized_path = tmp_path + ALLOWED_FORMATS[image_format]
+            try:
+                _downsample(tmp_path, resized_path, image_format, max_side)
+                os.replace(resized_path, path)
+            except OSError as e:
+                raise ValueError(f"Upload is not a valid image: {e}") from e
+            finally:
+                if os.path.exists(resized_path):
+                    os.remove(resized_path)
+        else:
+            os.replace(tmp_path, path)
+        return path
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -3,7 +3,8 @@ from speechify.tts import GetSpeechOptionsRequest
 import base64
 import os
 
-def speechify_tts(text, voice_id="scott", api_key=None, language="en-US", model="simba-english"):
+def speechify_tts(text, voice_id="scott", api_key=None, language="en-US", model="simba-english",
+                  output_path="outputs/speechify_audio.mp3", return_speech_marks=False):
     """
     Convert text to speech using Speechify API.
     
@@ -13,9 +14,13 @@ def speechify_tts(text, voice_id="scott", api_key=None, language="en-US", model=
         api_key (str): Speechify API key (if None, will use environment variable SPEECHIFY_API_KEY)
         language (str): Language code (default: "en-US")
         model (str): TTS model ("simba-english" or "simba-multilingual")
+        output_path (str): Where to write the audio file
+        return_speech_marks (bool): Also return the word/sentence timing
+            metadata from the response (see utils/subtitles.py)
     
     Returns:
-        str: Path to the generated audio file
+        str: Path to the generated audio file, or (path, speech_marks)
+        when return_speech_marks is True
     """
     # Use environment variable if api_key not provided
     if api_key is None:
@@ -43,12 +48,13 @@ def speechify_tts(text, voice_id="scott", api_key=None, language="en-US", model=
     audio_bytes = base64.b64decode(audio_response.audio_data)
     
     # Save to file
-    output_path = "outputs/speechify_audio.mp3"
-    os.makedirs("outputs", exist_ok=True)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
     
     with open(output_path, "wb") as f:
         f.write(audio_bytes)
     
+    if return_speech_marks:
+        return output_path, audio_response.speech_marks
     return output_path
 
 def get_available_voices(api_key=None):
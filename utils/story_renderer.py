@@ -0,0 +1,430 @@
+"""
+Incremental story rendering.
+
+The story is split into sentences and every stage output is cached on disk
+under a content hash of that stage's inputs:
+
+    analysis/<hash>.json   caption and emotion, keyed by the drawing's bytes
+    audio/<hash>.wav       narration of one sentence as PCM, keyed by its text and voice
+    video/<hash>.mp4       silent video segment, keyed by drawing, text and length
+    final/<hash>.*         narration, subtitles and final video for the whole story
+                           (and a first-sentence preview for fast playback start)
+
+Editing one sentence of the story therefore only re-synthesises that
+sentence and re-encodes the segments whose inputs actually changed; the
+rest is reused and joined with stream copies. Narration stays PCM until the
+final mux, so it is encoded once and the subtitle offsets match it exactly.
+
+The cache is bounded by CACHE_LIMITS; the least recently used files of each
+stage are evicted after every render. The cache is shared by every session,
+so files used within CACHE_GRACE_SECONDS are never evicted, even over the cap.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from .subtitles import offset_cues, speech_marks_to_cues, write_subtitles
+from .video_generator import (
+    MOTION_MODES,
+    _run_ffmpeg,
+    concat_video_segments,
+    prepare_source_image,
+    render_video_segment,
+)
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"')\]])\s+|\n+")
+
+DEFAULT_TTS_OPTIONS = {
+    "provider": "speechify",
+    "voice_id": "scott",
+    "language": "en-US",
+    "model": "simba-english",
+}
+
+# Sentences narrated in parallel on a cold render
+TTS_WORKERS = 4
+
+# Per-stage size caps for the cache, in bytes
+CACHE_LIMITS = {
+    "audio": 256 * 1024 * 1024,
+    "video": 1024 * 1024 * 1024,
+    "source": 256 * 1024 * 1024,
+    "final": 512 * 1024 * 1024,
+}
+
+# Files used this recently may belong to a render another session is still
+# stitching or showing, so eviction leaves them alone
+CACHE_GRACE_SECONDS = 60 * 60
+
+def content_hash(*parts):
+    """
+    Stable SHA-256 of a sequence of bytes, strings and JSON-serialisable values.
+
+    Each part is length-prefixed so ("ab", "c") and ("a", "bc") hash differently.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        elif isinstance(part, str):
+            data = part.encode("utf-8")
+        else:
+            data = json.dumps(part, sort_keys=True).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def split_sentences(story):
+    """Split a story into sentences, keeping their punctuation."""
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(story.strip()) if s and s.strip()]
+
+def _cache_path(cache_dir, stage, key, extension):
+    directory = os.path.join(cache_dir, stage)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{key}{extension}")
+
+def _temp_path(final_path):
+    # Unique per call, so concurrent renders of the same key never share a temp file
+    directory, name = os.path.split(final_path)
+    fd, path = tempfile.mkstemp(dir=directory, prefix=name + ".", suffix=".tmp" + os.path.splitext(name)[1])
+    os.close(fd)
+    return path
+
+def _publish(tmp_path, path):
+    # Atomic rename so a concurrent render never picks up a half-written file
+    os.replace(tmp_path, path)
+    return path
+
+def _touch(*paths):
+    # Mark cache hits as recently used so eviction keeps them
+    for path in paths:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_json(path, data):
+    tmp_path = _temp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return _publish(tmp_path, path)
+
+def _decode_to_wav(src_path, dst_path):
+    # One PCM format for every sentence so the clips join with a stream copy
+    _run_ffmpeg(["-i", src_path, "-ac", "1", "-ar", "44100", "-c:a", "pcm_s16le", dst_path])
+
+def _audio_duration_ms(wav_path):
+    """Exact length of a PCM WAV file, from its sample count."""
+    with wave.open(wav_path, "rb") as f:
+        return int(round(f.getnframes() * 1000 / f.getframerate()))
+
+def evict_cache(cache_dir, limits=CACHE_LIMITS, keep=(), grace_seconds=CACHE_GRACE_SECONDS):
+    """
+    Delete the least recently used files of each cache stage above its size cap.
+
+    Args:
+        cache_dir (str): Root of the content-addressed cache
+        limits (dict): Maximum bytes per stage directory
+        keep (iterable[str]): Paths that must survive (e.g. the render just returned)
+        grace_seconds (float): Never delete files used more recently than this
+    """
+    keep = {os.path.abspath(path) for path in keep}
+    cutoff = time.time() - grace_seconds
+    for stage, max_bytes in limits.items():
+        directory = os.path.join(cache_dir, stage)
+        if not os.path.isdir(directory):
+            continue
+
+        entries = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= max_bytes or mtime > cutoff:
+                break
+            if os.path.abspath(path) in keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def analyze_drawing(image_path, cache_dir="outputs/cache"):
+    """
+    Caption the drawing and infer its emotion, reusing a cached result for identical images.
+
+    Returns:
+        tuple[str, str]: (caption, emotion)
+    """
+    from .caption import get_caption
+    from .emotion import get_dominant_color, infer_emotion_from_color
+
+    path = _cache_path(cache_dir, "analysis", content_hash("analysis", file_hash(image_path)), ".json")
+    if os.path.exists(path):
+        cached = _read_json(path)
+        return cached["caption"], cached["emotion"]
+
+    caption = get_caption(Image.open(image_path))
+    emotion = infer_emotion_from_color(get_dominant_color(image_path))
+    _write_json(path, {"caption": caption, "emotion": emotion})
+    return caption, emotion
+
+def synthesize_sentence(sentence, tts_options, cache_dir="outputs/cache"):
+    """
+    Narrate one sentence, reusing the cached audio when text and voice are unchanged.
+
+    Returns:
+        dict: key, audio_path (PCM WAV), duration_ms, cues (relative to the
+        sentence start) and cached (True when nothing was synthesised)
+    """
+    from .tts_wrapper import tts_convert
+
+    # The API key changes nothing about the audio, so keep it out of the key
+    key = content_hash("tts", sentence, {k: v for k, v in tts_options.items() if k != "api_key"})
+    audio_path = _cache_path(cache_dir, "audio", key, ".wav")
+    meta_path = _cache_path(cache_dir, "audio", key, ".json")
+    if os.path.exists(audio_path) and os.path.exists(meta_path):
+        _touch(audio_path, meta_path)
+        return dict(_read_json(meta_path), key=key, audio_path=audio_path, cached=True)
+
+    mp3_path = _temp_path(_cache_path(cache_dir, "audio", key, ".mp3"))
+    wav_path = _temp_path(audio_path)
+    try:
+        _, speech_marks = tts_convert(text=sentence, output_path=mp3_path, return_speech_marks=True, **tts_options)
+        _decode_to_wav(mp3_path, wav_path)
+        duration_ms = _audio_duration_ms(wav_path)
+        _publish(wav_path, audio_path)
+    finally:
+        for path in (mp3_path, wav_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Providers without speech marks still get one cue spanning the sentence
+    cues = speech_marks_to_cues(speech_marks) or [(0, duration_ms, sentence)]
+    meta = {"duration_ms": duration_ms, "cues": cues}
+    _write_json(meta_path, meta)
+    return dict(meta, key=key, audio_path=audio_path, cached=False)
+
+def _stitch_audio(audio_paths, output_path):
+    """Join PCM WAV clips with a stream copy (no re-encode)."""
+    list_path = _temp_path(output_path + ".txt")
+    try:
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in audio_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        _run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path])
+    finally:
+        os.remove(list_path)
+    return output_path
+
+def _extract_audio(video_path, output_path):
+    # Stream copy of the final AAC track, so the narration is encoded only once
+    _run_ffmpeg(["-i", video_path, "-map", "0:a", "-c", "copy", output_path])
+    return output_path
+
+def _render_segment(cache_dir, source_path, image_key, sentence, frames, motion, fade_in, fade_out, fps,
+                    burn_in_text, start_frame=0, total_frames=None):
+    """Return (path, rendered) for one cached video segment, encoding it only on a cache miss."""
+    position = (start_frame, total_frames) if motion == "kenburns" else None
+    key = content_hash("video", image_key, sentence if burn_in_text else "", frames,
+                       motion, position, fade_in, fade_out, fps)
+    path = _cache_path(cache_dir, "video", key, ".mp4")
+    if os.path.exists(path):
+        _touch(path)
+        return path, False
+
+    tmp_path = _temp_path(path)
+    try:
+        render_video_segment(source_path, frames, tmp_path,
+                             overlay_text=sentence if burn_in_text else None, motion=motion,
+                             fade_in=fade_in, fade_out=fade_out, fps=fps,
+                             start_frame=start_frame, total_frames=total_frames)
+        _publish(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path, True
+
+def _render_preview(cache_dir, source_path, image_key, sentence, narration, motion, fps, burn_in_text):
+    """
+    Mux the first sentence on its own so playback can start before the rest is encoded.
+
+    In still mode the segment is exactly the story's first segment and is
+    reused for the full video. Ken Burns needs the story's total length,
+    which is unknown here, so its preview zooms over the sentence alone.
+
+    Returns:
+        tuple[str, str, bool]: video path, subtitles path, and whether a
+        segment had to be encoded
+    """
+    frames = max(1, round(narration["duration_ms"] * fps / 1000))
+    segment_path, rendered = _render_segment(cache_dir, source_path, image_key, sentence, frames, motion,
+                                             fade_in=True, fade_out=False, fps=fps, burn_in_text=burn_in_text,
+                                             total_frames=frames)
+
+    preview_key = content_hash("preview", narration["key"], segment_path)
+    paths = (_cache_path(cache_dir, "final", preview_key, ".mp4"), _cache_path(cache_dir, "final", preview_key, ".vtt"))
+    if all(os.path.exists(path) for path in paths):
+        _touch(*paths)
+        return paths + (rendered,)
+
+    temp_paths = [_temp_path(path) for path in paths]
+    try:
+        write_subtitles(narration["cues"], temp_paths[1])
+        concat_video_segments([segment_path], narration["audio_path"], temp_paths[0], temp_paths[1])
+        for tmp_path, path in zip(temp_paths, paths):
+            _publish(tmp_path, path)
+    finally:
+        for path in temp_paths:
+            if os.path.exists(path):
+                os.remove(path)
+    return paths + (rendered,)
+
+def render_story(image_path, story, cache_dir="outputs/cache", tts_options=None, motion="still",
+                 burn_in_text=False, fps=24, preview=None):
+    """
+    Render narration, subtitles and video for a story, recomputing only what changed.
+
+    Args:
+        image_path (str): Path to the drawing
+        story (str): Story text (possibly edited since the last render)
+        cache_dir (str): Root of the content-addressed cache
+        tts_options (dict, optional): provider, voice_id, language and model
+            passed to tts_convert (defaults to Speechify "scott")
+        motion (str): "still" or "kenburns". Ken Burns motion runs
+            continuously across the whole story, so segments depend on their
+            position and any change in total length re-renders them
+        burn_in_text (bool): Burn each sentence into its video segment in
+            addition to the soft subtitle track
+        fps (int): Frame rate
+        preview (callable, optional): Called with (video_path, subtitles_path)
+            of a playable MP4 of the first sentence as soon as it exists,
+            while the remaining sentences are still being narrated and
+            encoded. Not called for single-sentence stories
+
+    Returns:
+        dict: audio_path (AAC .m4a), video_path, subtitles_path, sentences,
+        and the number of sentences that were re-synthesised and video
+        segments that were re-encoded
+    """
+    if motion not in MOTION_MODES:
+        raise ValueError(f"Unsupported motion mode: {motion}. Supported modes: {', '.join(MOTION_MODES)}")
+
+    tts_options = dict(DEFAULT_TTS_OPTIONS, **(tts_options or {}))
+    sentences = split_sentences(story)
+    if not sentences:
+        raise ValueError("Story is empty")
+
+    image_key = file_hash(image_path)
+    source_path = _cache_path(cache_dir, "source", image_key, ".png")
+    if os.path.exists(source_path):
+        _touch(source_path)
+    else:
+        tmp_path = _temp_path(source_path)
+        prepare_source_image(image_path, tmp_path)
+        _publish(tmp_path, source_path)
+
+    # Stage 1: narration, one cached clip per sentence, uncached ones in parallel.
+    # The first sentence is previewed as soon as it is back, so time to first
+    # frame does not grow with the length of the story.
+    rendered = 0
+    with ThreadPoolExecutor(max_workers=min(TTS_WORKERS, len(sentences))) as pool:
+        narrations = pool.map(lambda sentence: synthesize_sentence(sentence, tts_options, cache_dir), sentences)
+        segments = [next(narrations)]
+        if preview and len(sentences) > 1:
+            preview_video, preview_subtitles, preview_rendered = _render_preview(
+                cache_dir, source_path, image_key, sentences[0], segments[0], motion, fps, burn_in_text)
+            rendered += preview_rendered
+            preview(preview_video, preview_subtitles)
+        segments.extend(narrations)
+
+    # Frame boundaries come from the cumulative narration time so rounding
+    # never drifts the picture away from the audio
+    boundaries = [0]
+    for segment in segments:
+        boundaries.append(boundaries[-1] + segment["duration_ms"])
+    frame_boundaries = [round(ms * fps / 1000) for ms in boundaries]
+    total_frames = frame_boundaries[-1]
+
+    # Stage 2: video segments
+    segment_paths = []
+    cues = []
+    for index, (sentence, segment) in enumerate(zip(sentences, segments)):
+        cues.extend(offset_cues(segment["cues"], boundaries[index]))
+        start_frame = frame_boundaries[index]
+        frames = max(1, frame_boundaries[index + 1] - start_frame)
+
+        path, segment_rendered = _render_segment(
+            cache_dir, source_path, image_key, sentence, frames, motion,
+            fade_in=index == 0, fade_out=index == len(sentences) - 1, fps=fps, burn_in_text=burn_in_text,
+            start_frame=start_frame, total_frames=total_frames)
+        rendered += segment_rendered
+        segment_paths.append(path)
+
+    # Stage 3: stitch. Keyed by everything above, so an unchanged story is free.
+    final_key = content_hash("final", [s["key"] for s in segments], segment_paths)
+    audio_path = _cache_path(cache_dir, "final", final_key, ".m4a")
+    subtitles_path = _cache_path(cache_dir, "final", final_key, ".vtt")
+    video_path = _cache_path(cache_dir, "final", final_key, ".mp4")
+    final_paths = (audio_path, subtitles_path, video_path)
+
+    if all(os.path.exists(path) for path in final_paths):
+        _touch(*final_paths)
+    else:
+        temp_paths = [_temp_path(path) for path in final_paths]
+        tmp_audio, tmp_subtitles, tmp_video = temp_paths
+        stitched_path = None
+        try:
+            if len(segments) == 1:
+                narration_path = segments[0]["audio_path"]
+            else:
+                stitched_path = narration_path = _stitch_audio(
+                    [s["audio_path"] for s in segments], _temp_path(_cache_path(cache_dir, "final", final_key, ".wav")))
+            write_subtitles(cues, tmp_subtitles)
+            concat_video_segments(segment_paths, narration_path, tmp_video, tmp_subtitles)
+            _extract_audio(tmp_video, tmp_audio)
+            for tmp_path, path in zip(temp_paths, final_paths):
+                _publish(tmp_path, path)
+        finally:
+            for path in temp_paths + [stitched_path]:
+                if path and os.path.exists(path):
+                    os.remove(path)
+
+    evict_cache(cache_dir, keep=final_paths + tuple(segment_paths))
+
+    return {
+        "audio_path": audio_path,
+        "video_path": video_path,
+        "subtitles_path": subtitles_path,
+        "sentences": len(sentences),
+        "sentences_synthesised": sum(not s["cached"] for s in segments),
+        "segments_rendered": rendered,
+    }
@@ -0,0 +1,129 @@
+"""
+Timed captions from TTS speech marks.
+
+Speechify returns speech marks as nested chunks (a sentence chunk holding
+word chunks), each with start_time/end_time in milliseconds. These helpers
+flatten them into word timings, group them into subtitle cues and write
+WebVTT or SRT files.
+"""
+
+import os
+
+SENTENCE_ENDINGS = (".", "!", "?", "…")
+
+def _field(mark, name, default=None):
+    # Speech marks arrive as dicts in tests and as SDK model objects from the API
+    if isinstance(mark, dict):
+        return mark.get(name, default)
+    return getattr(mark, name, default)
+
+def flatten_word_marks(speech_marks):
+    """
+    Flatten nested speech marks into a list of word timings.
+
+    Args:
+        speech_marks: A speech mark chunk (dict or SDK object), or a list of them
+
+    Returns:
+        list[tuple[int, int, str]]: (start_ms, end_ms, word) in spoken order
+    """
+    if speech_marks is None:
+        return []
+    if isinstance(speech_marks, (list, tuple)):
+        words = []
+        for mark in speech_marks:
+            words.extend(flatten_word_marks(mark))
+        return words
+
+    chunks = _field(speech_marks, "chunks") or []
+    if chunks:
+        return flatten_word_marks(list(chunks))
+
+    value = (_field(speech_marks, "value") or "").strip()
+    if not value:
+        return []
+    return [(int(_field(speech_marks, "start_time", 0)), int(_field(speech_marks, "end_time", 0)), value)]
+
+def speech_marks_to_cues(speech_marks, granularity="sentence", max_chars=80):
+    """
+    Group speech marks into subtitle cues.
+
+    Args:
+        speech_marks: Speech marks as returned by speechify_tts
+        granularity (str): "word" for one cue per word, or "sentence" to
+            group words up to sentence punctuation
+        max_chars (int): Split sentence cues longer than this many characters
+
+    Returns:
+        list[tuple[int, int, str]]: (start_ms, end_ms, text) cues
+    """
+    if granularity not in ("word", "sentence"):
+        raise ValueError(f"Unsupported subtitle granularity: {granularity}. Supported: word, sentence")
+
+    words = flatten_word_marks(speech_marks)
+    if granularity == "word":
+        return words
+
+    cues = []
+    current = []
+
+    def flush():
+        if current:
+            cues.append((current[0][0], current[-1][1], " ".join(word for _, _, word in current)))
+            current.clear()
+
+    for start, end, word in words:
+        if current and len(" ".join(w for _, _, w in current)) + 1 + len(word) > max_chars:
+            flush()
+        current.append((start, end, word))
+        if word.endswith(SENTENCE_ENDINGS):
+            flush()
+    flush()
+    return cues
+
+def offset_cues(cues, offset_ms):
+    """Shift every cue by offset_ms milliseconds."""
+    return [(start + offset_ms, end + offset_ms, text) for start, end, text in cues]
+
+def _timestamp(ms, separator):
+    hours, ms = divmod(int(ms), 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+def format_webvtt(cues):
+    lines = ["WEBVTT", ""]
+    for start, end, text in cues:
+        lines.append(f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}")
+        lines.append(text)
+        lines.append("")
+    return "\n".join(lines)
+
+def format_srt(cues):
+    lines = []
+    for index, (start, end, text) in enumerate(cues, start=1):
+        lines.append(str(index))
+        lines.append(f"{_timestamp(start, ',')} --> {_timestamp(end, ',')}")
+        lines.append(text)
+        lines.append("")
+    return "\n".join(lines)
+
+def write_subtitles(cues, output_path):
+    """
+    Write cues as WebVTT (.vtt) or SRT (.srt), chosen by file extension.
+
+    Returns:
+        str: Path to the written subtitle file
+    """
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension == ".vtt":
+        content = format_webvtt(cues)
+    elif extension == ".srt":
+        content = format_srt(cues)
+    else:
+        raise ValueError(f"Unsupported subtitle format: {extension}. Supported formats: .vtt, .srt")
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return output_path
@@ -0,0 +1,75 @@
+"""
+Synthetic drawings, stories and narration for the load test and benchmarks.
+
+Everything here is generated locally, so the tools that use it run without
+network access or real user content.
+"""
+
+import io
+import random
+import subprocess
+import threading
+
+from PIL import Image, ImageDraw
+
+WORDS = ("moon dragon castle rainbow forest river star cloud garden kitten "
+         "rocket ocean flower giant tiny friendly brave sleepy shiny secret").split()
+
+def make_story(num_words, seed=0):
+    """Build a deterministic pseudo-story of roughly num_words words."""
+    rng = random.Random(seed)
+    sentences = []
+    remaining = num_words
+    while remaining > 0:
+        length = min(remaining, rng.randint(6, 14))
+        words = [rng.choice(WORDS) for _ in range(length)]
+        sentences.append(" ".join(words).capitalize() + ".")
+        remaining -= length
+    return " ".join(sentences)
+
+def make_drawing(width, height, fmt="PNG", seed=0):
+    """Render a synthetic child's drawing and return the encoded bytes."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(width // 4 + 1), y0 + rng.randrange(height // 4 + 1)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        if rng.random() < 0.5:
+            draw.ellipse([x0, y0, x1, y1], outline=color, width=max(2, width // 200))
+        else:
+            draw.rectangle([x0, y0, x1, y1], fill=color)
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+class SilentAudio:
+    """Produce silent MP3s of a given length with the ffmpeg binary MoviePy uses."""
+
+    def __init__(self):
+        from moviepy.config import get_setting
+        self.ffmpeg = get_setting("FFMPEG_BINARY")
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def mp3(self, duration):
+        # Half-second buckets keep the stand-in cheap; the real services'
+        # encoding cost is not part of what we are measuring.
+        duration = max(0.5, round(duration * 2) / 2)
+        with self._lock:
+            if duration not in self._cache:
+                self._cache[duration] = subprocess.run(
+                    [self.ffmpeg, "-loglevel", "error", "-f", "lavfi",
+                     "-i", "anullsrc=r=44100:cl=mono", "-t", str(duration),
+                     "-q:a", "9", "-f", "mp3", "pipe:1"],
+                    check=True, capture_output=True,
+                ).stdout
+            return self._cache[duration]
+
+def parse_sizes(value):
+    sizes = []
+    for item in value.split(","):
+        width, height = item.lower().split("x")
+        sizes.append((int(width), int(height)))
+    return sizes
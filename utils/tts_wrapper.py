@@ -1,5 +1,5 @@
 import os
-from typing import Optional
+from typing import Any, Optional, Tuple, Union
 
 # Import both TTS implementations
 try:
@@ -16,7 +16,8 @@ except ImportError:
 
 def tts_convert(text: str, voice_id: str = "scott", api_key: Optional[str] = None, 
                 provider: str = "speechify", language: str = "en-US", 
-                model: str = "simba-english") -> str:
+                model: str = "simba-english", output_path: Optional[str] = None,
+                return_speech_marks: bool = False) -> Union[str, Tuple[str, Any]]:
     """
     Unified TTS function that supports both ElevenLabs and Speechify.
     
@@ -27,14 +28,20 @@ def tts_convert(text: str, voice_id: str = "scott", api_key: Optional[str] = Non
         provider (str): TTS provider ("speechify" or "elevenlabs")
         language (str): Language code (for Speechify only)
         model (str): TTS model (for Speechify only)
+        output_path (str, optional): Where to write the audio file
+            (defaults to the provider's standard output path)
+        return_speech_marks (bool): Also return timing metadata. Only
+            Speechify provides it; ElevenLabs returns None instead.
     
     Returns:
-        str: Path to the generated audio file
+        str: Path to the generated audio file, or (path, speech_marks)
+        when return_speech_marks is True
     
     Raises:
         ValueError: If provider is not supported or API key is missing
     """
     provider = provider.lower()
+    output_kwargs = {"output_path": output_path} if output_path else {}
     
     if provider == "speechify":
         if not SPEECHIFY_AVAILABLE:
@@ -49,7 +56,9 @@ def tts_convert(text: str, voice_id: str = "scott", api_key: Optional[str] = Non
             voice_id=voice_id,
             api_key=api_key,
             language=language,
-            model=model
+            model=model,
+            return_speech_marks=return_speech_marks,
+            **output_kwargs
         )
     
     elif provider == "elevenlabs":
@@ -60,11 +69,13 @@ def tts_convert(text: str, voice_id: str = "scott", api_key: Optional[str] = Non
         if api_key is None:
             api_key = os.getenv("ELEVENLABS_API_KEY")
         
-        return elevenlabs_tts(
+        audio_path = elevenlabs_tts(
             text=text,
             voice_id=voice_id,
-            api_key=api_key
+            api_key=api_key,
+            **output_kwargs
         )
+        return (audio_path, None) if return_speech_marks else audio_path
     
     else:
         raise ValueError(f"Unsupported TTS provider: {provider}. Supported providers: speechify, elevenlabs")
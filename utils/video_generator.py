@@ -1,18 +1,26 @@
-from moviepy.editor import ImageClip, CompositeVideoClip, AudioFileClip
+from moviepy.editor import AudioFileClip
+from moviepy.config import get_setting
 from PIL import Image, ImageDraw, ImageFont
+import subprocess
 import textwrap
 import os
 
-def create_story_frame(image_path, story_text, output_path="outputs/frame_story.png"):
-    img = Image.open(image_path).convert("RGBA")
-    width, height = img.size
+# Relocate the moov atom to the front of the file so browsers can start
+# playback after the first few kilobytes instead of fetching the whole video
+MOVFLAGS = "+faststart"
+
+MOTION_MODES = ("still", "kenburns")
+
+def render_story_overlay(size, story_text):
+    """Draw the translucent story box on a transparent RGBA layer of the given size."""
+    width, height = size
 
     # Create transparent overlay
-    overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
+    overlay = Image.new("RGBA", size, (0, 0, 0, 0))
     draw = ImageDraw.Draw(overlay)
 
     box_y = int(height * 0.65)
-    draw.rectangle([(0, box_y), (width, height)], fill=(0, 0, 0, 160))  
+    draw.rectangle([(0, box_y), (width, height)], fill=(0, 0, 0, 160))
 
     # Load font
     try:
@@ -22,17 +30,185 @@ def create_story_frame(image_path, story_text, output_path="outputs/frame_story.
 
     wrapped_text = textwrap.fill(story_text, width=40)
     draw.text((30, box_y + 20), wrapped_text, font=font, fill=(255, 255, 255, 255))
+    return overlay
+
+def _run_ffmpeg(args):
+    """Run the ffmpeg binary MoviePy is configured with, raising on failure."""
+    result = subprocess.run(
+        [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error"] + args,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.strip()}")
+
+def prepare_source_image(image_path, output_path, max_side=1280):
+    """
+    Save a downscaled RGB copy of the drawing with even dimensions (required by yuv420p).
+
+    Returns:
+        tuple[int, int]: Width and height of the saved image
+    """
+    img = Image.open(image_path).convert("RGB")
+    img.thumbnail((max_side, max_side))
+    width, height = img.size[0] // 2 * 2, img.size[1] // 2 * 2
+    img.crop((0, 0, width, height)).save(output_path)
+    return width, height
+
+def _zoompan_filter(width, height, frames, fps, zoom=1.15, start_frame=0, total_frames=None):
+    # Motion is a function of the frame's position in the whole video
+    # (on + start_frame out of total_frames), so consecutive segments
+    # continue the same zoom/pan instead of restarting it.
+    total_frames = total_frames or frames
+    progress = f"(on+{start_frame})/{total_frames}"
+    # Upscaling the single source frame once gives zoompan sub-pixel room,
+    # which avoids the jitter of integer crop offsets at low zoom speeds.
+    return (
+        f"scale=iw*2:ih*2,"
+        f"zoompan=z='1+{zoom - 1}*{progress}'"
+        f":x='(iw-iw/zoom)*{progress}':y='(ih-ih/zoom)/2'"
+        f":d={frames}:s={width}x{height}:fps={fps}"
+    )
+
+def render_video_segment(source_path, frames, output_path, overlay_text=None, motion="still",
+                         fade_in=False, fade_out=False, fps=24, start_frame=0, total_frames=None):
+    """
+    Render a silent, fixed-length video segment of the prepared drawing.
+
+    Segments rendered with the same source and fps share encoder settings, so
+    concat_video_segments can join them without re-encoding.
+
+    Args:
+        source_path (str): Image from prepare_source_image
+        frames (int): Segment length in frames
+        output_path (str): Where to write the segment
+        overlay_text (str, optional): Text burned into the story box
+        motion (str): "still" or "kenburns"
+        fade_in (bool): Fade in from black over the first second
+        fade_out (bool): Fade out to black over the last second
+        fps (int): Frame rate
+        start_frame (int): Position of the segment's first frame in the full
+            video, so Ken Burns motion continues across segments
+        total_frames (int, optional): Length of the full video in frames
+            (defaults to this segment's length)
+
+    Returns:
+        str: Path to the rendered segment
+    """
+    if motion not in MOTION_MODES:
+        raise ValueError(f"Unsupported motion mode: {motion}. Supported modes: {', '.join(MOTION_MODES)}")
+
+    width, height = Image.open(source_path).size
+    duration = frames / fps
+
+    if motion == "kenburns":
+        inputs = ["-i", source_path]
+        zoompan = _zoompan_filter(width, height, frames, fps, start_frame=start_frame, total_frames=total_frames)
+        background = f"[0:v]{zoompan},setsar=1[bg];"
+    else:
+        inputs = ["-loop", "1", "-framerate", str(fps), "-i", source_path]
+        background = "[0:v]setsar=1[bg];"
+
+    overlay_path = None
+    if overlay_text:
+        overlay_path = os.path.splitext(output_path)[0] + "_overlay.png"
+        render_story_overlay((width, height), overlay_text).save(overlay_path)
+        inputs += ["-i", overlay_path]
+        effects = ["overlay=0:0"]
+        label = "[bg][1:v]"
+    else:
+        effects = []
+        label = "[bg]"
+
+    if fade_in:
+        effects.append("fade=t=in:st=0:d=1")
+    if fade_out:
+        effects.append(f"fade=t=out:st={max(0, duration - 1):.3f}:d=1")
+    effects.append("format=yuv420p")
 
-    final = Image.alpha_composite(img, overlay)
-    final.convert("RGB").save(output_path)
+    try:
+        _run_ffmpeg(inputs + [
+            "-filter_complex", f"{background}{label}{','.join(effects)}[v]",
+            "-map", "[v]",
+            "-frames:v", str(frames),
+            "-r", str(fps),
+            "-c:v", "libx264",
+            output_path,
+        ])
+    finally:
+        if overlay_path:
+            os.remove(overlay_path)
+    return output_path
+
+def concat_video_segments(segment_paths, audio_path, output_path, subtitles_path=None):
+    """
+    Join video segments without re-encoding and mux in the narration and subtitles.
+
+    Returns:
+        str: Path to the final video
+    """
+    list_path = os.path.splitext(output_path)[0] + "_segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    inputs = ["-f", "concat", "-safe", "0", "-i", list_path, "-i", audio_path]
+    stream_args = ["-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac"]
+    if subtitles_path:
+        inputs += ["-i", subtitles_path]
+        stream_args += ["-map", "2:s", "-c:s", "mov_text"]
+
+    try:
+        _run_ffmpeg(inputs + stream_args + ["-movflags", MOVFLAGS, output_path])
+    finally:
+        os.remove(list_path)
     return output_path
 
-def generate_final_video(image_path, audio_path, story_text, output_path="outputs/final_video.mp4"):
-    frame_path = create_story_frame(image_path, story_text)
+def generate_final_video(image_path, audio_path, story_text, output_path="outputs/final_video.mp4",
+                         motion="still", subtitles_path=None, burn_in_text=True, fps=24):
+    """
+    Render the story video as a web-optimised MP4 in one segment.
+
+    Uses the same encoder path as utils/story_renderer.py (a single
+    render_video_segment joined with the narration by
+    concat_video_segments), just without the per-sentence cache.
+
+    Args:
+        image_path (str): Path to the drawing
+        audio_path (str): Path to the narration audio
+        story_text (str): Story text burned into the frame
+        output_path (str): Where to write the final video
+        motion (str): "still" for a static frame or "kenburns" for a slow
+            zoom/pan over the drawing with the story overlay kept fixed
+        subtitles_path (str, optional): WebVTT/SRT file muxed in as a soft
+            subtitle track (see utils/subtitles.py)
+        burn_in_text (bool): Draw the story box into the frames. Turn it off
+            when the text is carried by subtitles instead
+        fps (int): Frame rate
+
+    Returns:
+        str: Path to the generated video file
+    """
+    if motion not in MOTION_MODES:
+        raise ValueError(f"Unsupported motion mode: {motion}. Supported modes: {', '.join(MOTION_MODES)}")
+
     audio = AudioFileClip(audio_path)
-    image_clip = ImageClip(frame_path).set_duration(audio.duration).set_audio(audio)
+    frames = max(1, int(round(audio.duration * fps)))
+    audio.close()
 
-    final = CompositeVideoClip([image_clip.fadein(1).fadeout(1)])
-    final.write_videofile(output_path, fps=24)
+    base_path = os.path.splitext(output_path)[0]
+    source_path = base_path + "_source.png"
+    segment_path = base_path + "_segment.mp4"
+    try:
+        prepare_source_image(image_path, source_path)
+        render_video_segment(source_path, frames, segment_path,
+                             overlay_text=story_text if burn_in_text else None, motion=motion,
+                             fade_in=True, fade_out=True, fps=fps)
+        concat_video_segments([segment_path], audio_path, output_path, subtitles_path)
+    finally:
+        for path in (source_path, segment_path):
+            if os.path.exists(path):
+                os.remove(path)
 
-    return output_path
\ No newline at end of file
+    return output_path